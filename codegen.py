@@ -4,10 +4,36 @@ from mg_ast import *
 import sys
 
 # Configuración básica
+DEFAULT_TRIPLE = binding.get_default_triple()  # Ej: x86_64-pc-linux-gnu (se consulta una sola vez)
 INT_TYPE = ir.IntType(32)
 INT_PTR = ir.PointerType(INT_TYPE)
 BOOL_TYPE = ir.IntType(1)
-STRING_TYPE = ir.PointerType(ir.IntType(8))
+I8 = ir.IntType(8)
+I64 = ir.IntType(64)
+STRING_TYPE = ir.PointerType(I8)
+
+# Constantes reutilizables (evita recrearlas en cada nodo)
+INT_ZERO = ir.Constant(INT_TYPE, 0)
+BOOL_FALSE = ir.Constant(BOOL_TYPE, 0)
+BOOL_TRUE = ir.Constant(BOOL_TYPE, 1)
+
+# Caché de tipos arreglo [n x i8] por longitud
+_I8_ARRAYS = {}
+
+
+def i8_array(n: int) -> ir.ArrayType:
+    """Devuelve el tipo [n x i8], creándolo una sola vez por longitud"""
+    ty = _I8_ARRAYS.get(n)
+    if ty is None:
+        ty = _I8_ARRAYS[n] = ir.ArrayType(I8, n)
+    return ty
+
+# Formatos de printf para enteros (ya codificados, con \0 final)
+FMT_INT = b"%d\x00"
+FMT_INT_LN = b"%d\n\x00"
+
+# Nodos cuyo valor se imprime como entero en print/println
+_PRINT_INT_TYPES = frozenset({Identifier, BinOp, UnaryOp})
 
 # Mapeo simple de tipos MiniGo → LLVM
 TYPE_MAP = {
@@ -15,11 +41,22 @@ TYPE_MAP = {
     'bool': BOOL_TYPE,
 }
 
+def is_pure(node: Node) -> bool:
+    """True si evaluar la expresión no tiene efectos ni puede fallar (sin / ni %)"""
+    if isinstance(node, (Literal, Identifier)):
+        return True
+    if isinstance(node, UnaryOp):
+        return is_pure(node.expr)
+    if isinstance(node, BinOp):
+        return node.op not in ('/', '%') and is_pure(node.left) and is_pure(node.right)
+    return False
+
+
 class CodeGen:
     def __init__(self):
         # Crear módulo LLVM
         self.module = ir.Module(name="minigo_module")
-        self.module.triple = binding.get_default_triple()  # Ej: x86_64-pc-linux-gnu
+        self.module.triple = DEFAULT_TRIPLE
 
         # El builder maneja dónde insertar instrucciones
         self.builder: ir.IRBuilder = None
@@ -30,6 +67,9 @@ class CodeGen:
         # Función actual
         self.current_func = None
 
+        # Pool de cadenas constantes: bytes codificados → puntero i8*
+        self._str_pool = {}
+
         # Inicializar funciones externas
         self.declare_printf()
         self.declare_main()
@@ -50,23 +90,34 @@ class CodeGen:
         self.builder = ir.IRBuilder(block)
         self.current_func = main_func
 
+    def _get_cstring(self, encoded: bytes, prefix="str"):
+        """Devuelve un i8* a una constante global, reutilizando duplicados"""
+        ptr = self._str_pool.get(encoded)
+        if ptr is None:
+            cstr = ir.Constant(i8_array(len(encoded)), bytearray(encoded))
+            global_str = ir.GlobalVariable(self.module, cstr.type, name=f"{prefix}.{len(self.module.globals)}")
+            global_str.linkage = 'private'
+            global_str.global_constant = True
+            global_str.initializer = cstr
+            ptr = global_str.bitcast(STRING_TYPE)
+            self._str_pool[encoded] = ptr
+        return ptr
+
     def compile(self, node: Node):
         """Compila el AST completo"""
         if isinstance(node, Program):
             self.visit(node)
             # Asegurar retorno final en main
             if not self.builder.block.is_terminated:
-                self.builder.ret(ir.Constant(INT_TYPE, 0))
+                self.builder.ret(INT_ZERO)
         else:
             raise RuntimeError(f"Nodo raíz inesperado: {type(node)}")
 
     def visit(self, node: Node):
-        method_name = f'visit_{type(node).__name__}'
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+        return _VISIT_TBL[node.KIND](self, node)
 
     def generic_visit(self, node: Node):
-        raise NotImplementedError(f"No se implementó visit_{type(node).__name__}")
+        raise NotImplementedError(f"No se implementó {type(node)._visit_name}")
 
     def visit_Program(self, node: Program):
         self.visit(node.func_main)
@@ -83,7 +134,7 @@ class CodeGen:
 
     def visit_VarDecl(self, node: VarDecl):
         # Reservar espacio en stack
-        alloca = self.builder.alloca(TYPE_MAP[node.type_name], name=node.name)
+        alloca = self.builder.alloca(TYPE_MAP[node.type_name])
         self.vars[node.name] = alloca
 
         # Si hay valor inicial, asignarlo
@@ -105,30 +156,23 @@ class CodeGen:
         alloca = self.vars.get(node.name)
         if alloca is None:
             raise RuntimeError(f"Variable no encontrada: {node.name}")
-        return self.builder.load(alloca, name=node.name)
+        return self.builder.load(alloca)
 
     def visit_Literal(self, node: Literal):
         if node.type_tag == 'int':
             return ir.Constant(INT_TYPE, node.value)
         elif node.type_tag == 'bool':
-            return ir.Constant(BOOL_TYPE, 1 if node.value else 0)
+            return BOOL_TRUE if node.value else BOOL_FALSE
         elif node.type_tag == 'string':
             # ✅ Codificar correctamente a UTF-8 + \0
-            encoded = (node.value + '\0').encode('utf8')
-            n = len(encoded)
-            cstr = ir.Constant(
-                ir.ArrayType(ir.IntType(8), n),
-                bytearray(encoded)
-            )
-            global_str = ir.GlobalVariable(self.module, cstr.type, name=f"str.{len(self.module.globals)}")
-            global_str.linkage = 'private'
-            global_str.global_constant = True
-            global_str.initializer = cstr
-            return self.builder.bitcast(global_str, STRING_TYPE)
+            return self._get_cstring((node.value + '\0').encode('utf8'))
         else:
             raise RuntimeError(f"Tipo literal desconocido: {node.type_tag}")
 
     def visit_BinOp(self, node: BinOp):
+        if node.op in ('&&', '||'):
+            return self._lower_logical(node)
+
         left = self.visit(node.left)
         right = self.visit(node.right)
 
@@ -150,111 +194,74 @@ class CodeGen:
         elif node.op in ['<', '<=', '>', '>=']:
             # Usar el operador directamente, no el nombre de instrucción LLVM
             return self.builder.icmp_signed(node.op, left, right)
-        elif node.op == '&&':
-            # Cortocircuito: evaluar left && right
-            # Resultado final en r0 (i1)
-            
-            # Evaluar left
-            left_val = self.visit(node.left)
-            if left_val.type == INT_TYPE:
-                zero = ir.Constant(INT_TYPE, 0)
-                left_bool = self.builder.icmp_signed('!=', left_val, zero)
-            else:
-                left_bool = left_val
-
-            # Si left es falso → resultado = falso
-            # Si left es verdadero → evaluar right
-            end_block = self.builder.function.append_basic_block("and.end")
-            right_block = self.builder.function.append_basic_block("and.right")
-            merge_block = self.builder.function.append_basic_block("and.merge")
-
-            # from left: br i1 left_bool, label %right_block, label %end_block
-            self.builder.cbranch(left_bool, right_block, end_block)
-
-            # Bloque 'right': evaluar right
-            self.builder.position_at_end(right_block)
-            right_val = self.visit(node.right)
-            if right_val.type == INT_TYPE:
-                zero = ir.Constant(INT_TYPE, 0)
-                right_bool = self.builder.icmp_signed('!=', right_val, zero)
-            else:
-                right_bool = right_val
-            self.builder.branch(merge_block)
-
-            # Bloque 'end': resultado = false
-            self.builder.position_at_end(end_block)
-            false_val = ir.Constant(BOOL_TYPE, False)
-            self.builder.branch(merge_block)
 
-            # Merge: phi[true → right_bool, false → false]
-            self.builder.position_at_end(merge_block)
-            phi = self.builder.phi(BOOL_TYPE)
-            phi.add_incoming(right_bool, right_block)
-            phi.add_incoming(false_val, end_block)
-            return phi
-
-        elif node.op == '||':
-            # similar, pero invertido
-            left_val = self.visit(node.left)
-            if left_val.type == INT_TYPE:
-                zero = ir.Constant(INT_TYPE, 0)
-                left_bool = self.builder.icmp_signed('!=', left_val, zero)
-            else:
-                left_bool = left_val
-
-            end_block = self.builder.function.append_basic_block("or.end")
-            right_block = self.builder.function.append_basic_block("or.right")
-            merge_block = self.builder.function.append_basic_block("or.merge")
-
-            self.builder.cbranch(left_bool, end_block, right_block)
-
-            self.builder.position_at_end(right_block)
-            right_val = self.visit(node.right)
-            if right_val.type == INT_TYPE:
-                zero = ir.Constant(INT_TYPE, 0)
-                right_bool = self.builder.icmp_signed('!=', right_val, zero)
-            else:
-                right_bool = right_val
-            self.builder.branch(merge_block)
+    def to_bool(self, value):
+        """Convierte un entero a i1 (value != 0); un i1 se devuelve tal cual"""
+        if value.type == INT_TYPE:
+            return self.builder.icmp_signed('!=', value, INT_ZERO)
+        return value
 
-            self.builder.position_at_end(end_block)
-            true_val = ir.Constant(BOOL_TYPE, True)
-            self.builder.branch(merge_block)
+    def _lower_logical(self, node: BinOp):
+        """Cortocircuito de && y ||"""
+        left_bool = self.to_bool(self.visit(node.left))
+
+        # Si evaluar right no puede fallar, se evalúa siempre y se elige con
+        # select: no hace falta crear bloques ni phi
+        if is_pure(node.right):
+            right_bool = self.to_bool(self.visit(node.right))
+            if node.op == '&&':
+                return self.builder.select(left_bool, right_bool, BOOL_FALSE)
+            return self.builder.select(left_bool, BOOL_TRUE, right_bool)
+
+        # El bloque actual salta directo a merge cuando el resultado ya se conoce
+        prefix = "and" if node.op == '&&' else "or"
+        left_end = self.builder.block
+        right_block = self.builder.function.append_basic_block(f"{prefix}.right")
+        merge_block = self.builder.function.append_basic_block(f"{prefix}.merge")
+        if node.op == '&&':
+            # Si left es falso → resultado = falso; si no, evaluar right
+            self.builder.cbranch(left_bool, right_block, merge_block)
+            short_val = BOOL_FALSE
+        else:
+            # Si left es verdadero → resultado = verdadero; si no, evaluar right
+            self.builder.cbranch(left_bool, merge_block, right_block)
+            short_val = BOOL_TRUE
+
+        # Bloque 'right': evaluar right (puede abrir bloques propios)
+        self.builder.position_at_end(right_block)
+        right_bool = self.to_bool(self.visit(node.right))
+        right_end = self.builder.block
+        self.builder.branch(merge_block)
 
-            self.builder.position_at_end(merge_block)
-            phi = self.builder.phi(BOOL_TYPE)
-            phi.add_incoming(true_val, end_block)
-            phi.add_incoming(right_bool, right_block)
-            return phi
+        # Merge
+        self.builder.position_at_end(merge_block)
+        phi = self.builder.phi(BOOL_TYPE)
+        phi.add_incoming(right_bool, right_end)
+        phi.add_incoming(short_val, left_end)
+        return phi
 
     def visit_UnaryOp(self, node: UnaryOp):
         expr = self.visit(node.expr)
         if node.op == '!':
-            zero = ir.Constant(BOOL_TYPE, 0)
-            return self.builder.icmp_signed('==', expr, zero)
+            return self.builder.icmp_signed('==', expr, BOOL_FALSE)
         elif node.op == '-':
-            zero = ir.Constant(INT_TYPE, 0)
-            return self.builder.sub(zero, expr)
+            return self.builder.sub(INT_ZERO, expr)
         else:
             raise RuntimeError(f"Operador unario desconocido: {node.op}")
 
     def visit_IfStmt(self, node: IfStmt):
-        cond = self.visit(node.cond)
-
         # Convertir a bool si es necesario (los enteros pueden usarse como condiciones)
-        if cond.type == INT_TYPE:
-            zero = ir.Constant(INT_TYPE, 0)
-            cond = self.builder.icmp_signed('!=', cond, zero)
-        elif cond.type != BOOL_TYPE:
+        cond = self.to_bool(self.visit(node.cond))
+        if cond.type != BOOL_TYPE:
             raise RuntimeError(f"Condición debe ser bool, no {cond.type}")
 
-        # Crear bloques
+        # Crear bloques de una vez, en el orden del CFG: then, else, merge
         then_block = self.builder.append_basic_block("if.then")
-        merge_block = self.builder.append_basic_block("if.merge")
-        else_block = merge_block
-
         if node.else_body:
             else_block = self.builder.append_basic_block("if.else")
+        merge_block = self.builder.append_basic_block("if.merge")
+        if not node.else_body:
+            else_block = merge_block
 
         self.builder.cbranch(cond, then_block, else_block)
 
@@ -280,10 +287,7 @@ class CodeGen:
         self.builder.branch(header)
 
         self.builder.position_at_end(header)
-        cond = self.visit(node.cond)
-        if cond.type == INT_TYPE:
-            zero = ir.Constant(INT_TYPE, 0)
-            cond = self.builder.icmp_signed('!=', cond, zero)
+        cond = self.to_bool(self.visit(node.cond))
         self.builder.cbranch(cond, body, after)
 
         self.builder.position_at_end(body)
@@ -296,7 +300,6 @@ class CodeGen:
     def visit_Call(self, node: Call):
         if node.func_name in ['print', 'println']:
             arg = node.args[0]
-            self.visit(node.args[0])  # Asegura que el valor esté en r0 (para expresiones)
 
             # Determinar formato y argumentos
             if isinstance(arg, Literal) and arg.type_tag == 'string':
@@ -305,45 +308,16 @@ class CodeGen:
                 if node.func_name == 'println':
                     fmt_str += '\n'
                 # Codificar a UTF-8 + \0
-                encoded = fmt_str.encode('utf8') + b'\x00'
-                n = len(encoded)
-                cfmt = ir.Constant(
-                    ir.ArrayType(ir.IntType(8), n),
-                    bytearray(encoded)
-                )
-                global_fmt = ir.GlobalVariable(
-                    self.module, cfmt.type,
-                    name=f"fmt.{len(self.module.globals)}"
-                )
-                global_fmt.linkage = 'private'
-                global_fmt.global_constant = True
-                global_fmt.initializer = cfmt
-                fmt_ptr = self.builder.bitcast(global_fmt, STRING_TYPE)
+                fmt_ptr = self._get_cstring(fmt_str.encode('utf8') + b'\x00', "fmt")
                 # Llamar: printf(fmt)
                 self.builder.call(self.printf, [fmt_ptr])
 
-            elif isinstance(arg, Identifier) or isinstance(arg, BinOp) or isinstance(arg, UnaryOp):
+            elif type(arg) in _PRINT_INT_TYPES:
                 # Imprimir entero
-                fmt_str = "%d"
-                if node.func_name == 'println':
-                    fmt_str += '\n'
-                encoded = fmt_str.encode('utf8') + b'\x00'
-                n = len(encoded)
-                cfmt = ir.Constant(
-                    ir.ArrayType(ir.IntType(8), n),
-                    bytearray(encoded)
-                )
-                global_fmt = ir.GlobalVariable(
-                    self.module, cfmt.type,
-                    name=f"fmt.{len(self.module.globals)}"
-                )
-                global_fmt.linkage = 'private'
-                global_fmt.global_constant = True
-                global_fmt.initializer = cfmt
-                fmt_ptr = self.builder.bitcast(global_fmt, STRING_TYPE)
+                fmt_ptr = self._get_cstring(FMT_INT_LN if node.func_name == 'println' else FMT_INT, "fmt")
                 # Promover int a i64 para var_arg
                 int_val = self.visit(arg)
-                int64_val = self.builder.zext(int_val, ir.IntType(64))
+                int64_val = self.builder.zext(int_val, I64)
                 # Llamar: printf(fmt, value)
                 self.builder.call(self.printf, [fmt_ptr, int64_val])
 
@@ -351,26 +325,11 @@ class CodeGen:
                 raise RuntimeError(f"Tipo no soportado en print: {arg}")
         else:
             raise RuntimeError(f"Función no soportada: {node.func_name}")
-        
-    def print_clean_ir(self):
-        """Imprime el IR sin nombres internos ni metadatos"""
-        lines = str(self.module).splitlines()
-        clean_lines = []
-        for line in lines:
-            # Eliminar comentarios
-            if '!' in line and not line.startswith('!'):
-                continue
-            # Eliminar nombres temporales como %".1", pero mantener %printf
-            if 'declare' in line and 'printf' in line:
-                clean_lines.append('declare i32 @printf(i8*, ...)')
-            elif '@fmt.' in line or '@str.' in line:
-                # Mantener constantes, pero limpiar posible metadata
-                if 'private constant' in line:
-                    clean_lines.append(line.split(',')[0] + '}')
-                else:
-                    clean_lines.append(line)
-            else:
-                # Eliminar nombres de temporales si están entre comillas
-                cleaned = line.replace('"', '')
-                clean_lines.append(cleaned)
-        return '\n'.join(clean_lines)
\ No newline at end of file
+
+
+# Tabla de despacho indexada por KIND: función visit_* o generic_visit
+# (una sola vez por proceso, no por cada CodeGen)
+_VISIT_TBL = [
+    getattr(CodeGen, cls._visit_name, CodeGen.generic_visit)
+    for cls in NODE_KINDS
+]
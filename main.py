@@ -2,19 +2,158 @@
 import subprocess
 import os
 import sys
+import hashlib
+import shutil
+import tempfile
+import io
+import contextlib
+import functools
+from concurrent.futures import ProcessPoolExecutor
 from preprocessor import preprocess_source
 from mg_lexer import lexer
 from mg_parser import parser
 from semant import SemanticAnalyzer
 from codegen import CodeGen  # Asegúrate de tener este archivo
+import llvmlite
+from llvmlite import binding
+
+
+# Perfiles de destino ARM: parámetros de llvmlite y del enlazador.
+# Los triples se escriben normalizados (con vendor) para que LLVM reconozca
+# el entorno gnueabihf (ABI hard-float).
+ARM_PROFILES = {
+    "armv7": {
+        "description": "ARMv7 + hard-float",
+        "triple": "armv7l-unknown-linux-gnueabihf",  # Little-endian ARMv7 + hf
+        "cpu": "cortex-a7",                          # CPU común de ARMv7
+        "features": "",
+        "link_flags": [
+            "-march=armv7-a",       # Objetivo: ARMv7-A
+            "-mfpu=vfpv3-d16",      # FPU requerido
+            "-mfloat-abi=hard",     # Hard-float ABI
+        ],
+        "suffix": "_armv7",
+    },
+    "armv6": {
+        "description": "ARMv6 + hard-float",
+        "triple": "armv6-unknown-linux-gnueabihf",   # Raspberry Pi 1 / Zero
+        "cpu": "arm1176jzf-s",
+        "features": "+vfp2",
+        "link_flags": [
+            "-march=armv6",
+            "-mfpu=vfp",
+            "-mfloat-abi=hard",
+        ],
+        "suffix": "_armv6",
+    },
+}
+
+# Perfil seleccionado con MINIGO_TARGET=armv7|armv6 (por defecto armv7)
+TARGET_NAME = os.environ.get("MINIGO_TARGET", "armv7")
+if TARGET_NAME not in ARM_PROFILES:
+    sys.exit(f"❌ Perfil '{TARGET_NAME}' desconocido. Opciones: {', '.join(ARM_PROFILES)}")
+PROFILE = ARM_PROFILES[TARGET_NAME]
+
+# === Emisión de código objeto en proceso con llvmlite (sin 'llc') ===
+try:
+    binding.initialize()
+except RuntimeError:
+    pass  # llvmlite >= 0.45 inicializa LLVM automáticamente
+binding.initialize_all_targets()
+binding.initialize_all_asmprinters()
+
+
+def create_target_machine(profile=PROFILE):
+    """Crea la máquina destino del perfil (mismos parámetros que usaba llc)"""
+    try:
+        target = binding.Target.from_triple(profile["triple"])
+    except RuntimeError as e:
+        sys.exit(f"❌ Objetivo ARM no disponible en llvmlite: {e}")
+    return target.create_target_machine(cpu=profile["cpu"], features=profile["features"],
+                                        reloc="default", codemodel="default")
+
+
+TARGET_MACHINE = create_target_machine()
+
+# Salida de depuración detallada (tokens, etc.) con MINIGO_VERBOSE=1
+VERBOSE = bool(os.environ.get("MINIGO_VERBOSE"))
+
+# Nivel de optimización del IR antes de emitir (MINIGO_OPT=0|1|2|3)
+OPT_NAME = os.environ.get("MINIGO_OPT", "2")
+if OPT_NAME not in ("0", "1", "2", "3"):
+    sys.exit(f"❌ Nivel de optimización '{OPT_NAME}' inválido. Opciones: 0, 1, 2, 3")
+OPT_LEVEL = int(OPT_NAME)
+
+
+# Cada archivo .go define su propio main, así que los módulos no se pueden
+# enlazar en uno solo; en su lugar se reutiliza la configuración del
+# pipeline entre todos los archivos que procesa un mismo proceso.
+
+@functools.lru_cache(maxsize=None)
+def pipeline_tuning_options():
+    """Opciones del nuevo pass manager (una sola instancia por proceso)"""
+    return binding.PipelineTuningOptions(speed_level=OPT_LEVEL)
+
+
+@functools.lru_cache(maxsize=None)
+def legacy_pass_manager():
+    """ModulePassManager clásico ya poblado (una sola instancia por proceso)"""
+    pmb = binding.PassManagerBuilder()
+    pmb.opt_level = OPT_LEVEL
+    pm = binding.ModulePassManager()
+    pmb.populate(pm)
+    return pm
+
+
+def optimize_module(mod_ref):
+    """Aplica el pipeline de optimización de LLVM al módulo según OPT_LEVEL"""
+    if OPT_LEVEL <= 0:
+        return
+    if hasattr(binding, "PassBuilder"):
+        # llvmlite >= 0.44: nuevo pass manager. El ModulePassManager se
+        # consume al ejecutarse, por eso se crea uno por módulo.
+        pb = binding.PassBuilder(TARGET_MACHINE, pipeline_tuning_options())
+        pb.getModulePassManager().run(mod_ref, pb)
+    else:
+        legacy_pass_manager().run(mod_ref)
+
+
+def compiler_fingerprint():
+    """Hash de los módulos del compilador, para invalidar el caché si cambian"""
+    h = hashlib.sha256()
+    for module in ("preprocessor", "mg_lexer", "mg_parser", "mg_ast", "semant", "codegen",
+                   __name__):
+        with open(sys.modules[module].__file__, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
+COMPILER_FINGERPRINT = compiler_fingerprint()
+
+
+def cache_key(processed_code):
+    """Clave del caché de artefactos: fuente + compilador + llvmlite + objetivo + optimización"""
+    h = hashlib.sha256()
+    for part in (processed_code, COMPILER_FINGERPRINT, llvmlite.__version__,
+                 PROFILE["triple"], PROFILE["cpu"], str(OPT_LEVEL)):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
 
 
 def parse_file(filepath, output_dir="output"):
+    """Compila un archivo .go. Retorna True si se generó el binario enlazado."""
     # Crear directorio de salida si no existe
     os.makedirs(output_dir, exist_ok=True)
     
     # Obtener el nombre base del archivo sin extensión
     base_name = os.path.splitext(os.path.basename(filepath))[0]
+    ll_filename = os.path.join(output_dir, f"{base_name}.ll")
+    bc_filename = os.path.join(output_dir, f"{base_name}.bc")
+    o_filename = os.path.join(output_dir, f"{base_name}.o")
+    bin_filename = os.path.join(output_dir, f"{base_name}{PROFILE['suffix']}")
+    cache_dir = os.path.join(output_dir, ".cache")
+    stamp_filename = os.path.join(cache_dir, f"{base_name}.stamp")
     
     print(f"\n📄 Analizando: {filepath}")
     print("=" * 60)
@@ -24,53 +163,76 @@ def parse_file(filepath, output_dir="output"):
             code = f.read()
     except Exception as e:
         print(f"❌ Error al leer el archivo: {e}")
-        return None
+        return False
+
+    # Si la fuente no cambió desde la última compilación exitosa y el
+    # objeto y el binario siguen ahí, no hay nada que hacer
+    # (en modo detallado se recompila siempre, para mostrar tokens, AST e IR)
+    source_key = cache_key(code)
+    if (not VERBOSE and read_stamp(stamp_filename) == source_key
+            and os.path.exists(o_filename) and os.path.exists(bin_filename)):
+        print("✅ Sin cambios desde la última compilación; se omite.")
+        return True
 
     # Preprocesar
     try:
         processed_code = preprocess_source(code)
-        print("✅ Código preprocesado:")
-        print("---")
-        print(processed_code)
-        print("---")
+        print("✅ Código preprocesado.")
+        if VERBOSE:
+            sys.stdout.write(f"---\n{processed_code}\n---\n")
     except Exception as e:
         print(f"❌ Error en preprocesamiento: {e}")
-        return None
+        return False
 
-    # Tokenización
-    try:
-        print("📝 Tokens generados:")
-        lexer.input(processed_code)
-        has_tokens = False
-        while True:
-            tok = lexer.token()
-            if not tok:
-                break
-            print(tok)
-            has_tokens = True
-        if not has_tokens:
-            print("  (ningún token generado)")
-    except Exception as e:
-        print(f"❌ Error en tokenización: {e}")
-        return None
+    # Caché por contenido: si la fuente no cambió, reutilizar .bc/.o previos
+    key = cache_key(processed_code)
+    cached_bc = os.path.join(cache_dir, f"{key}.bc")
+    cached_o = os.path.join(cache_dir, f"{key}.o")
+    if (not VERBOSE and os.path.exists(cached_bc) and os.path.exists(cached_o)
+            and restore_cached(cached_bc, cached_o, bc_filename, o_filename)):
+        print(f"♻️ Sin cambios: usando artefactos en caché ({key[:12]})")
+        if not link_binary(output_o=o_filename, output_bin=bin_filename):
+            return False
+        write_stamp(stamp_filename, source_key)
+        return True
+
+    # Tokenización: el parser consume los tokens directamente del lexer;
+    # el volcado completo solo se hace en modo detallado
+    if VERBOSE:
+        try:
+            print("📝 Tokens generados:")
+            reset_lexer()
+            lexer.input(processed_code)
+            # Un solo write en lugar de un print por token
+            tokens = list(iter(lexer.token, None))
+            if tokens:
+                sys.stdout.write("\n".join(map(str, tokens)) + "\n")
+            else:
+                print("  (ningún token generado)")
+        except Exception as e:
+            print(f"❌ Error en tokenización: {e}")
+            return False
 
     # Parseo
     ast = None
     try:
         print("\n🧩 Generando AST...")
+        reset_lexer()
         ast = parser.parse(processed_code, lexer=lexer)
         if ast is not None:
-            print(ast)
+            # El repr recorre el árbol completo: solo en modo detallado
+            if VERBOSE:
+                print(ast)
             print("✅ AST generado exitosamente.")
         else:
             print("❌ AST es None.")
-            return None
+            return False
     except SyntaxError as e:
         print(f"❌ Error de sintaxis: {e}")
-        return None
+        return False
     except Exception as e:
         print(f"❌ Error inesperado en parsing: {e}")
-        return None
+        return False
 
     # === Análisis semántico ===
     try:
@@ -82,99 +244,189 @@ def parse_file(filepath, output_dir="output"):
             print("❌ Errores semánticos encontrados:")
             for error in analyzer.errors:
                 print(f"  • {error.message}")
-            return None
+            if analyzer.aborted:
+                print(f"  ⚠️ Análisis detenido tras {len(analyzer.errors)} errores; "
+                      "el resto del programa no se revisó.")
+            return False
     except Exception as e:
         print(f"❌ Error en análisis semántico: {e}")
-        return None
+        return False
+
+    # Programa vacío: todos generan el mismo objeto, que se guarda una vez
+    is_empty = not ast.func_main.body.statements
+    empty_key = cache_key("")
+    empty_bc = os.path.join(cache_dir, f"empty_main.{empty_key}.bc")
+    empty_o = os.path.join(cache_dir, f"empty_main.{empty_key}.o")
+    if (not VERBOSE and is_empty and os.path.exists(empty_bc) and os.path.exists(empty_o)
+            and restore_cached(empty_bc, empty_o, bc_filename, o_filename)):
+        print("♻️ main vacío: usando objeto precompilado")
+        if not link_binary(output_o=o_filename, output_bin=bin_filename):
+            return False
+        write_stamp(stamp_filename, source_key)
+        return True
 
     # === Generación de código LLVM IR ===
     print("\n💻 Generando código LLVM IR...")
     try:
         cg = CodeGen()
         cg.compile(ast)
-        print("✅ Código LLVM generado:")
-        print(cg.module)
+        # Serializar el módulo una sola vez y reutilizar el texto
+        ir_text = str(cg.module)
+        print("✅ Código LLVM generado.")
 
-        # Guardar .ll con nombre basado en el archivo de entrada
-        ll_filename = os.path.join(output_dir, f"{base_name}.ll")
-        with open(ll_filename, "w") as f:
-            f.write(str(cg.module))
-        print(f"📄 IR guardado en '{ll_filename}'")
+        # El IR textual solo se muestra y guarda en modo detallado (depuración)
+        if VERBOSE:
+            sys.stdout.write(ir_text)
+            write_atomic(ll_filename, ir_text.encode("utf-8"))
+            print(f"📄 IR guardado en '{ll_filename}'")
+
+        # Parsear el IR una vez y guardarlo como bitcode (binario y compacto)
+        mod_ref = binding.parse_assembly(ir_text)
+        mod_ref.verify()
+        # Triple y data layout del perfil ARM antes de persistir el bitcode
+        mod_ref.triple = TARGET_MACHINE.triple
+        mod_ref.data_layout = str(TARGET_MACHINE.target_data)
+        write_atomic(bc_filename, mod_ref.as_bitcode())
+        print(f"📄 Bitcode guardado en '{bc_filename}'")
 
         # Emitir objeto ARMv6
-        o_filename = os.path.join(output_dir, f"{base_name}.o")
-        if emit_object_file(cg, output_ll=ll_filename, output_o=o_filename):
-            # Enlazar binario
-            bin_filename = os.path.join(output_dir, f"{base_name}_armv7")
-            link_binary(output_o=o_filename, output_bin=bin_filename)
+        if not emit_object_file(mod_ref, output_o=o_filename):
+            return False
+
+        # Guardar en caché para próximas ejecuciones (si falla, solo se pierde el caché)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            copy_atomic(bc_filename, cached_bc)
+            copy_atomic(o_filename, cached_o)
+            if is_empty:
+                copy_atomic(bc_filename, empty_bc)
+                copy_atomic(o_filename, empty_o)
+        except OSError as e:
+            print(f"⚠️ No se pudo guardar en caché: {e}")
+
+        # Enlazar binario
+        if not link_binary(output_o=o_filename, output_bin=bin_filename):
+            return False
+        write_stamp(stamp_filename, source_key)
 
     except Exception as e:
         print(f"❌ Error en generación de código: {e}")
+        return False
+
+    return True
+
+
+def write_atomic(filename, data):
+    """Escribe bytes en un temporal único del mismo directorio y lo renombra:
+    nunca queda un archivo a medias, aunque escriban varios procesos a la vez"""
+    fd, tmp_filename = tempfile.mkstemp(dir=os.path.dirname(filename) or ".",
+                                        prefix=f".{os.path.basename(filename)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            os.fchmod(f.fileno(), 0o644)  # mkstemp crea con 0600
+            f.write(data)
+        os.replace(tmp_filename, filename)
+    except BaseException:
+        # No dejar temporales huérfanos si falla la escritura o el renombrado
+        try:
+            os.unlink(tmp_filename)
+        except OSError:
+            pass
+        raise
+
+
+def copy_atomic(src, dst):
+    """Copia un archivo con write_atomic: otro proceso que consulte el caché
+    nunca ve la copia a medias"""
+    with open(src, "rb") as f:
+        write_atomic(dst, f.read())
+
+
+def reset_lexer():
+    """Deja el lexer global como nuevo: PLY conserva lineno entre entradas"""
+    lexer.lineno = 1
+    lexer.begin('INITIAL')
+
+
+def restore_cached(cached_bc, cached_o, bc_filename, o_filename):
+    """Copia .bc/.o desde el caché a la salida. Retorna False si no se pudo
+    (la entrada se trata como ausente y se recompila)"""
+    try:
+        shutil.copyfile(cached_bc, bc_filename)
+        shutil.copyfile(cached_o, o_filename)
+    except OSError as e:
+        print(f"⚠️ Caché ilegible, se recompila: {e}")
+        return False
+    return True
+
+
+def read_stamp(stamp_filename):
+    """Lee la clave de la última compilación exitosa de un archivo (o None)"""
+    try:
+        with open(stamp_filename, "r") as f:
+            return f.read().strip()
+    except OSError:
         return None
 
-    return ast  # Opcional: si quieres usarlo después
+
+def write_stamp(stamp_filename, source_key):
+    """Registra que el archivo se compiló y enlazó con esta clave"""
+    try:
+        os.makedirs(os.path.dirname(stamp_filename), exist_ok=True)
+        with open(stamp_filename, "w") as f:
+            f.write(source_key)
+    except OSError as e:
+        print(f"⚠️ No se pudo guardar el sello de compilación: {e}")
 
 
-def emit_object_file(cg, output_ll="output.ll", output_o="output.o"):
-    """Genera archivo .o para ARMv7 + hard-float usando llc"""
-    print(f"\n🔧 Emitiendo código objeto: {output_o} (ARMv7 + hard-float)")
+def emit_object_file(mod_ref, output_o="output.o"):
+    """Genera archivo .o para el perfil ARM en proceso con llvmlite.
 
-    # Guardar LLVM IR
-    with open(output_ll, "w") as f:
-        f.write(str(cg.module))
+    El módulo ya debe tener el triple y el data layout de TARGET_MACHINE.
+    """
+    print(f"\n🔧 Emitiendo código objeto: {output_o} ({PROFILE['description']})")
 
     try:
-        result = subprocess.run([
-            "llc",
-            "-march=arm",                       # Arquitectura ARM
-            "-mtriple=armv7l-linux-gnueabihf",  # Triple clave: little-endian ARMv7 + hf
-            "-mcpu=cortex-a7",                  # CPU común de ARMv7
-            "-float-abi=hard",                  # ABI con FPU
-            "-filetype=obj",
-            output_ll,
-            "-o", output_o
-        ], check=True, capture_output=True, text=True)
+        optimize_module(mod_ref)
+        write_atomic(output_o, TARGET_MACHINE.emit_object(mod_ref))
 
         print(f"✅ Archivo objeto generado: {output_o}")
         return True
 
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error en llc: {e.stderr}")
-        print(f"📝 Salida: {e.stdout}")
-        return False
-    except FileNotFoundError:
-        print("❌ 'llc' no encontrado. Instala LLVM: sudo apt install llvm")
+    except RuntimeError as e:
+        print(f"❌ Error en emisión de objeto: {e}")
         return False
 
-def link_binary(output_o="output.o", output_bin="programa_armv7"):
-    """Enlaza el objeto en un binario estático ARMv7"""
+
+def link_binary(output_o="output.o", output_bin="programa_armv7", profile=PROFILE):
+    """Enlaza el objeto en un binario estático para el perfil ARM"""
     print(f"\n🔗 Enlazando binario: {output_bin}")
 
     try:
         result = subprocess.run([
             "arm-linux-gnueabihf-gcc",
             "-static",              # Sin dependencias dinámicas
-            "-march=armv7-a",       # Objetivo: ARMv7-A
-            "-mfpu=vfpv3-d16",      # FPU requerido
-            "-mfloat-abi=hard",     # Hard-float ABI
+            *profile["link_flags"],
             output_o,
             "-o", output_bin
         ], check=True, capture_output=True, text=True)
 
         print(f"✅ Binario generado: {output_bin}")
 
-        # Mostrar info básica del binario
-        try:
-            objdump = subprocess.run(
-                ["arm-linux-gnueabihf-readelf", "-A", output_bin],
-                capture_output=True, text=True, check=True
-            )
-            attrs = objdump.stdout.strip()
-            for line in attrs.splitlines():
-                if "Tag_CPU_arch" in line or "Tag_FP_arch" in line or "Tag_ABI_VFP_args" in line:
-                    print(f"   {line.strip()}")
-        except:
-            pass
+        # Mostrar info básica del binario (un proceso readelf extra por
+        # archivo, así que solo en modo detallado)
+        if VERBOSE:
+            try:
+                objdump = subprocess.run(
+                    ["arm-linux-gnueabihf-readelf", "-A", output_bin],
+                    capture_output=True, text=True, check=True
+                )
+                attrs = objdump.stdout.strip()
+                for line in attrs.splitlines():
+                    if "Tag_CPU_arch" in line or "Tag_FP_arch" in line or "Tag_ABI_VFP_args" in line:
+                        print(f"   {line.strip()}")
+            except:
+                pass
 
         return True
 
@@ -187,6 +439,20 @@ def link_binary(output_o="output.o", output_bin="programa_armv7"):
 
 
 
+def _compile_one(task):
+    """Compila un archivo dentro del pool; retorna (éxito, salida capturada)"""
+    filepath, output_dir = task
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        try:
+            ok = parse_file(filepath, output_dir)
+        except Exception as e:
+            # Un fallo inesperado solo hace fallar este archivo, no todo el lote
+            print(f"❌ Error inesperado en {filepath}: {e!r}")
+            ok = False
+    return ok, buffer.getvalue()
+
+
 def main():
     tests_dir = "tests"
     output_dir = "output"
@@ -195,7 +461,11 @@ def main():
         print(f"❌ Carpeta '{tests_dir}' no encontrada.")
         sys.exit(1)
     
-    go_files = [f for f in os.listdir(tests_dir) if f.endswith(".go")]
+    # scandir trae el tipo de cada entrada sin stat extra por archivo
+    entries = [e for e in os.scandir(tests_dir) if e.name.endswith(".go") and e.is_file()]
+    # Los más grandes primero, para que ninguno largo quede al final del pool
+    entries.sort(key=lambda e: e.stat().st_size, reverse=True)
+    go_files = [e.name for e in entries]
     
     if not go_files:
         print(f"⚠️ No se encontraron archivos '.go' en '{tests_dir}/'")
@@ -208,11 +478,20 @@ def main():
     # Crear directorio de salida
     os.makedirs(output_dir, exist_ok=True)
     
-    # Procesar cada archivo
-    for filename in go_files:
-        filepath = os.path.join(tests_dir, filename)
-        parse_file(filepath, output_dir)
+    # Procesar los archivos en paralelo (cada uno es independiente).
+    # La salida de cada archivo se captura y se imprime en orden.
+    tasks = [(e.path, output_dir) for e in entries]
+    failed = []
+    with ProcessPoolExecutor(max_workers=min(len(tasks), os.cpu_count() or 1)) as ex:
+        for filename, (ok, log) in zip(go_files, ex.map(_compile_one, tasks)):
+            sys.stdout.write(log)
+            if not ok:
+                failed.append(filename)
     
+    if failed:
+        print(f"\n❌ {len(failed)} de {len(go_files)} archivo(s) con errores: {', '.join(failed)}")
+        sys.exit(1)
+
     print("\n🎉 Análisis y generación de código completados.")
 
 
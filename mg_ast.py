@@ -1,126 +1,156 @@
 # mg_ast.py
 # Representación del Árbol de Sintaxis Abstracta para MiniGo
+import sys
+
+# Nombres de tipo internados: el análisis semántico los compara con `is`
+TYPE_INT = sys.intern('int')
+TYPE_BOOL = sys.intern('bool')
+TYPE_STRING = sys.intern('string')
+
+# Clases de nodo en orden de definición; su índice es el KIND de la clase
+NODE_KINDS = []
+
 
 class Node:
     """Clase base para todos los nodos del AST"""
-    pass
+    # Sin __dict__ por instancia: cada subclase declara sus propios campos
+    __slots__ = ()
+    # Campos que contienen nodos hijos (o listas de ellos), en orden de visita
+    _CHILDREN = ()
+
+    def __repr__(self):
+        return ast_repr(self)
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Nombre del método visitante, precalculado por clase
+        cls._visit_name = f'visit_{cls.__name__}'
+        # Entero pequeño por clase, para despachar indexando listas
+        cls.KIND = len(NODE_KINDS)
+        NODE_KINDS.append(cls)
+
+
+def ast_repr(node):
+    """Repr genérico: Clase(campo1, campo2, ...) según los __slots__ de la clase"""
+    fields = ", ".join(str(getattr(node, slot)) for slot in type(node).__slots__)
+    return f"{type(node).__name__}({fields})"
 
 
 class Program(Node):
     """Representa el programa completo (por ahora solo main)"""
+    __slots__ = ('func_main',)
+    _CHILDREN = ('func_main',)
+
     def __init__(self, func_main):
         self.func_main = func_main  # Nodo Function
 
-    def __repr__(self):
-        return f"Program({self.func_main})"
-
 
 class Function(Node):
     """Función (solo main por ahora)"""
+    __slots__ = ('name', 'body')
+    _CHILDREN = ('body',)
+
     def __init__(self, name, body):
         self.name = name      # str, ej: "main"
         self.body = body      # Block
 
-    def __repr__(self):
-        return f"Function({self.name}, {self.body})"
-
 
 class Block(Node):
     """Bloque de sentencias: { stmt1; stmt2; ... }"""
+    __slots__ = ('statements',)
+    _CHILDREN = ('statements',)
+
     def __init__(self, statements):
         self.statements = statements  # Lista de Statement
 
-    def __repr__(self):
-        return f"Block({self.statements})"
-
 
 class VarDecl(Node):
     """Declaración de variable: var x int = 42"""
+    __slots__ = ('name', 'type_name', 'expr')
+    _CHILDREN = ('expr',)
+
     def __init__(self, name, type_name, expr=None):
         self.name = name        # str
         self.type_name = type_name  # str, ej: "int"
         self.expr = expr        # Expression, opcional
 
-    def __repr__(self):
-        return f"VarDecl({self.name}: {self.type_name} = {self.expr})"
-
 
 class Assign(Node):
     """Asignación: x = x + 1"""
+    __slots__ = ('name', 'expr')
+    _CHILDREN = ('expr',)
+
     def __init__(self, name, expr):
         self.name = name    # str
         self.expr = expr    # Expression
 
-    def __repr__(self):
-        return f"Assign({self.name} = {self.expr})"
-
 
 class BinOp(Node):
     """Operación binaria: +, -, *, /, %, ==, !=, <, <=, >, >=, &&, ||"""
+    __slots__ = ('left', 'op', 'right')
+    _CHILDREN = ('left', 'right')
+
     def __init__(self, left, op, right):
         self.left = left    # Expression
         self.op = op        # str
         self.right = right  # Expression
 
-    def __repr__(self):
-        return f"BinOp({self.left}, {self.op}, {self.right})"
-
 
 class UnaryOp(Node):
     """Operación unaria: !"""
+    __slots__ = ('op', 'expr')
+    _CHILDREN = ('expr',)
+
     def __init__(self, op, expr):
         self.op = op     # str, ej: "!"
         self.expr = expr # Expression
 
-    def __repr__(self):
-        return f"UnaryOp({self.op}, {self.expr})"
-
 
 class IfStmt(Node):
     """Sentencia if: if cond { then } else { else_body }"""
+    __slots__ = ('cond', 'then_body', 'else_body')
+    _CHILDREN = ('cond', 'then_body', 'else_body')
+
     def __init__(self, cond, then_body, else_body=None):
         self.cond = cond         # Expression
         self.then_body = then_body   # Block
         self.else_body = else_body   # Block or None
 
-    def __repr__(self):
-        return f"IfStmt({self.cond}, {self.then_body}, {self.else_body})"
-
 
 class ForStmt(Node):
     """Bucle for: for cond { body }"""
+    __slots__ = ('cond', 'body')
+    _CHILDREN = ('cond', 'body')
+
     def __init__(self, cond, body):
         self.cond = cond  # Expression
         self.body = body  # Block
 
-    def __repr__(self):
-        return f"ForStmt({self.cond}, {self.body})"
-
 
 class Identifier(Node):
     """Referencia a una variable: x"""
+    __slots__ = ('name',)
+    _CHILDREN = ()
+
     def __init__(self, name):
         self.name = name  # str
 
-    def __repr__(self):
-        return f"Id({self.name})"
-
 
 class Literal(Node):
     """Literal: número, string, true, false"""
+    __slots__ = ('value', 'type_tag')
+    _CHILDREN = ()
+
     def __init__(self, value, type_tag):
         self.value = value     # int, str, bool
         self.type_tag = type_tag  # 'int', 'string', 'bool'
 
-    def __repr__(self):
-        return f"Lit({self.value}:{self.type_tag})"
-
 
 class Call(Node):
     """Llamada a función: print(...)"""
+    __slots__ = ('func_name', 'args')
+    _CHILDREN = ('args',)
+
     def __init__(self, func_name, args):
         self.func_name = func_name  # str
         self.args = args            # Lista de Expression
-
-    def __repr__(self):
-        return f"Call({self.func_name}, {self.args})"
\ No newline at end of file
@@ -1,4 +1,6 @@
 # lexer.py
+import sys
+
 import ply.lex as lex
 
 # === Lista de nombres de tokens ===
@@ -76,14 +78,14 @@ def t_newline(t):
     r'\n+'
     t.lexer.lineno += len(t.value)
 
-# Manejo de comentarios (opcionales, pero útiles)
-def t_COMMENT(t):
-    r'//.*'
-    pass  # Ignorar
+# Comentarios: regla ignorada sin función, se descartan dentro del regex maestro
+t_ignore_COMMENT = r'//[^\n]*'
 
 # Identificadores y palabras reservadas
 def t_IDENTIFIER(t):
     r'[a-zA-Z_][a-zA-Z_0-9]*'
+    # Internar: cada aparición del mismo nombre comparte un único str
+    t.value = sys.intern(t.value)
     t.type = reserved.get(t.value, 'IDENTIFIER')  # Chequear si es palabra clave
     return t
 
@@ -1,6 +1,9 @@
 # mg_parser.py
 # Asume que el código ya fue preprocesado: sin package, sin import, y fmt.Print → print. 
 
+import os
+import sys
+
 from ply import yacc
 from mg_ast import *
 from mg_lexer import tokens, lexer  # ← ¡Importamos tokens aquí!
@@ -39,7 +42,9 @@ def p_statement_list_empty(p):
 
 def p_statement_list_many(p):
     'statement_list : statement_list statement'
-    p[0] = p[1] + [p[2]]
+    # Extender la lista en sitio: p[1] + [p[2]] copiaba todo en cada reducción
+    p[1].append(p[2])
+    p[0] = p[1]
 
 # --------------------
 # Sentencias
@@ -47,7 +52,7 @@ def p_statement_list_many(p):
 def p_type_spec(p):
     '''type_spec : TYPE_INT
                  | TYPE_BOOL'''
-    p[0] = p[1]  # Devuelve el nombre del tipo como string: 'int' o 'bool'
+    p[0] = p[1]  # Nombre del tipo (internado por el lexer): 'int' o 'bool'
 
 def p_statement_var_decl(p):
     'statement : VAR IDENTIFIER type_spec ASSIGN expression'
@@ -96,11 +101,12 @@ def p_expression_binop(p):
                   | expression GE expression
                   | expression AND expression
                   | expression OR expression'''
-    p[0] = BinOp(left=p[1], op=p[2], right=p[3])
+    # Internar el operador: el lexer entrega un str nuevo por cada aparición
+    p[0] = BinOp(left=p[1], op=sys.intern(p[2]), right=p[3])
 
 def p_expression_unary_not(p):
     'expression : NOT expression'
-    p[0] = UnaryOp(op=p[1], expr=p[2])
+    p[0] = UnaryOp(op=sys.intern(p[1]), expr=p[2])
 
 def p_expression_uminus(p):
     'expression : MINUS expression %prec UMINUS'
@@ -112,19 +118,19 @@ def p_expression_group(p):
 
 def p_expression_number(p):
     'expression : NUMBER'
-    p[0] = Literal(value=p[1], type_tag='int')
+    p[0] = Literal(value=p[1], type_tag=TYPE_INT)
 
 def p_expression_string(p):
     'expression : STRING'
-    p[0] = Literal(value=p[1], type_tag='string')
+    p[0] = Literal(value=p[1], type_tag=TYPE_STRING)
 
 def p_expression_true(p):
     'expression : TRUE'
-    p[0] = Literal(value=True, type_tag='bool')
+    p[0] = Literal(value=True, type_tag=TYPE_BOOL)
 
 def p_expression_false(p):
     'expression : FALSE'
-    p[0] = Literal(value=False, type_tag='bool')
+    p[0] = Literal(value=False, type_tag=TYPE_BOOL)
 
 def p_expression_identifier(p):
     'expression : IDENTIFIER'
@@ -153,4 +159,7 @@ def p_error(p):
 # Construcción del parser
 # ====================
 
-parser = yacc.yacc(debug=False, write_tables=False)
\ No newline at end of file
+# Las tablas LALR se generan una vez en mg_parsetab.py (junto a este módulo)
+# y se reutilizan; PLY las regenera solo si la gramática cambia
+parser = yacc.yacc(debug=False, write_tables=True, tabmodule='mg_parsetab',
+                   outputdir=os.path.dirname(os.path.abspath(__file__)))
\ No newline at end of file
@@ -1,19 +1,15 @@
 # preprocessor.py
-def preprocess_source(source_code: str) -> str:
-    lines = source_code.splitlines()
-    output = []
-
-    for line in lines:
-        stripped = line.strip()
+import re
 
-        # Ignorar package e import
-        if stripped.startswith("package ") or stripped.startswith("import "):
-            continue
+# Lineas de package/import completas (incluido su salto de linea)
+_PKG_IMP_RE = re.compile(r'^[ \t]*(?:package|import)[ \t][^\n]*\n?', re.MULTILINE)
+# fmt.Print y fmt.Println -> print y println
+_FMT_RE = re.compile(r'fmt\.Print')
 
-        # Reemplazar fmt.Print y fmt.Println
-        line = line.replace("fmt.Print", "print")
-        line = line.replace("fmt.Println", "println")
 
-        output.append(line)
+def preprocess_source(source_code: str) -> str:
+    # Ignorar package e import
+    source_code = _PKG_IMP_RE.sub('', source_code)
 
-    return "\n".join(output)
\ No newline at end of file
+    # Reemplazar fmt.Print y fmt.Println
+    return _FMT_RE.sub('print', source_code)
@@ -1,83 +1,168 @@
 # semant.py
 from mg_ast import *
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Tuple
+
+# Marca de "sin declaración previa" en el registro de deshacer
+_UNBOUND = object()
+
 
 class SymbolTable:
-    """Tabla de símbolos con soporte para ámbitos anidados"""
+    """Tabla de símbolos con soporte para ámbitos anidados.
+
+    Un único dict guarda la declaración visible de cada nombre; cada ámbito
+    recuerda qué nombres declaró y qué valor tapaban, para restaurarlo al salir.
+    """
+    __slots__ = ('table', 'scopes', '_last_name', '_last_type')
+
     def __init__(self):
-        self.scopes = [{}]  # Pila de ámbitos. El primero es global.
+        self.table = {}     # nombre → tipo visible
+        self.scopes = [{}]  # Pila de ámbitos: nombre → tipo previo. El primero es global.
+        # Última búsqueda (nombre, tipo): en una expresión se repite el mismo nombre
+        self._last_name = None
+        self._last_type = None
 
     def declare(self, name: str, type_name: str, lineno=None) -> bool:
         """Declara una variable en el ámbito actual. Retorna False si ya existe."""
-        if name in self.scopes[-1]:
+        scope = self.scopes[-1]
+        if name in scope:
             return False
-        self.scopes[-1][name] = type_name
+        scope[name] = self.table.get(name, _UNBOUND)
+        self.table[name] = type_name
+        self._last_name = None
         return True
 
     def lookup(self, name: str) -> Optional[str]:
-        """Busca una variable desde el ámbito más interno al externo. Retorna su tipo o None."""
-        for scope in reversed(self.scopes):
-            if name in scope:
-                return scope[name]
-        return None
+        """Busca la declaración visible de una variable. Retorna su tipo o None."""
+        if name is self._last_name:
+            return self._last_type
+        var_type = self._last_type = self.table.get(name)
+        self._last_name = name
+        return var_type
 
     def enter_scope(self):
         """Abre un nuevo ámbito (ej: dentro de { ... })"""
         self.scopes.append({})
 
     def exit_scope(self):
-        """Cierra el ámbito actual"""
+        """Cierra el ámbito actual y restaura las variables que tapaba"""
         if len(self.scopes) > 1:
-            self.scopes.pop()
+            self._last_name = None
+            table = self.table
+            for name, previous in self.scopes.pop().items():
+                if previous is _UNBOUND:
+                    del table[name]
+                else:
+                    table[name] = previous
         else:
             raise Exception("No se puede salir del ámbito global")
 
 
 class SemanticError(Exception):
     """Excepción para errores semánticos"""
+    __slots__ = ('message', 'lineno')
+
     def __init__(self, message: str, lineno=None):
         self.message = message
         self.lineno = lineno
         super().__init__(self.message)
 
 
+# Errores semánticos: id → plantilla. El texto se arma solo al consultarlos
+(ERR_UNSUPPORTED_FUNC, ERR_UNKNOWN_TYPE, ERR_REDECLARED, ERR_DECL_MISMATCH,
+ ERR_UNDECLARED, ERR_ASSIGN_MISMATCH, ERR_ARITH_OPERANDS, ERR_COMPARE_OPERANDS,
+ ERR_EQUALITY_OPERANDS, ERR_LOGIC_OPERANDS, ERR_NOT_OPERAND, ERR_NEG_OPERAND,
+ ERR_IF_COND, ERR_FOR_COND) = range(14)
+_ERR_TEMPLATES = (
+    "Función no soportada: {}",
+    "Tipo desconocido '{}'",
+    "Variable '{}' ya fue declarada en este ámbito",
+    "Tipo incompatible en declaración: esperado {}, obtenido {}",
+    "Variable '{}' no declarada",
+    "Tipo incompatible en asignación: '{}' es {}, pero se asigna {}",
+    # Errores de operadores binarios: argumentos (op, tipo izq., tipo der.)
+    "Operador '{0}' espera operandos int",
+    "Comparación '{0}' requiere int",
+    "Comparación de igualdad entre tipos incompatibles: {1} y {2}",
+    "Operador lógico '{0}' espera bool",
+    "Operador '!' espera un operando bool, no {}",
+    "Operador '-' unario espera int, no {}",
+    "Condición de 'if' debe ser bool, no {}",
+    "Condición de 'for' debe ser bool, no {}",
+)
+
+
+# Operadores binarios: op → (tipo resultado, tipo exigido a ambos operandos, error).
+# Sin tipo exigido (None), los operandos solo deben coincidir entre sí
+_ARITH = (TYPE_INT, TYPE_INT, ERR_ARITH_OPERANDS)
+_COMPARE = (TYPE_BOOL, TYPE_INT, ERR_COMPARE_OPERANDS)
+_LOGIC = (TYPE_BOOL, TYPE_BOOL, ERR_LOGIC_OPERANDS)
+_BINOP_TABLE = {
+    '+': _ARITH, '-': _ARITH, '*': _ARITH, '/': _ARITH, '%': _ARITH,
+    '<': _COMPARE, '<=': _COMPARE, '>': _COMPARE, '>=': _COMPARE,
+    # Igualdad: ambos operandos del mismo tipo, cualquiera que sea
+    '==': (TYPE_BOOL, None, ERR_EQUALITY_OPERANDS),
+    '&&': _LOGIC, '||': _LOGIC,
+}
+
+
+class _AbortAnalysis(Exception):
+    """Se alcanzó el límite de errores: se deja de recorrer el AST"""
+
+
 class SemanticAnalyzer:
     """Recorre el AST y verifica reglas semánticas"""
-    
-    def __init__(self):
+    __slots__ = ('symbol_table', 'errors_limit', 'aborted', '_raw_errors', '_errors')
+
+    def __init__(self, errors_limit: int = 100):
         self.symbol_table = SymbolTable()
-        self.errors: List[SemanticError] = []
+        self.errors_limit = errors_limit  # Se detiene al llegar a este número de errores
+        self.aborted = False  # True si se alcanzó el límite y no se recorrió todo el AST
+        self._raw_errors: List[Tuple[int, tuple]] = []  # (id de plantilla, argumentos)
+        self._errors: Optional[List[SemanticError]] = None
 
-    def error(self, msg: str, node=None):
-        """Agrega un error semántico"""
+    def error(self, err_id: int, *args):
+        """Agrega un error semántico (el mensaje se formatea después)"""
         # Aún no tenemos número de línea en los nodos, pero podrías agregarlo
-        self.errors.append(SemanticError(msg))
+        self._raw_errors.append((err_id, args))
+        self._errors = None
+        if len(self._raw_errors) >= self.errors_limit:
+            raise _AbortAnalysis
+
+    @property
+    def errors(self) -> List[SemanticError]:
+        """Errores encontrados, como SemanticError con su mensaje"""
+        if self._errors is None:
+            self._errors = [SemanticError(_ERR_TEMPLATES[err_id].format(*args))
+                            for err_id, args in self._raw_errors]
+        return self._errors
 
     def analyze(self, node: Node):
         """Punto de entrada"""
-        self.visit(node)
-        return len(self.errors) == 0  # True si no hay errores
-
-    def visit(self, node: Node):
-        """Despacha al método específico"""
+        try:
+            self.visit(node)
+        except _AbortAnalysis:
+            self.aborted = True  # Los errores ya registrados se reportan igual
+        return not self._raw_errors  # True si no hay errores
+
+    def visit(self, node: Node) -> Optional[str]:
+        """Despacha al método específico; devuelve el tipo de la expresión (o None)"""
         if node is None:
-            return
-        method_name = f'visit_{type(node).__name__}'
-        visitor = getattr(self, method_name, self.generic_visit)
-        visitor(node)
+            return None
+        return _VISIT_TBL[node.KIND](self, node)
 
     def generic_visit(self, node: Node):
-        """Visita todos los atributos del nodo"""
-        for key in vars(node):
-            value = getattr(node, key)
-            if isinstance(value, list):
+        """Visita todos los hijos del nodo"""
+        for name in type(node)._CHILDREN:
+            value = getattr(node, name)
+            if type(value) is list:
                 for item in value:
                     self.visit(item)
-            elif isinstance(value, Node):
-                self.visit(value)
+            else:
+                self.visit(value)  # visit ignora None
 
     # ====================
     # Visitantes específicos
+    # (las expresiones devuelven su tipo inferido)
     # ====================
 
     def visit_Program(self, node: Program):
@@ -87,7 +172,7 @@ class SemanticAnalyzer:
         if node.name == "main":
             self.visit(node.body)
         else:
-            self.error(f"Función no soportada: {node.name}")
+            self.error(ERR_UNSUPPORTED_FUNC, node.name)
 
     def visit_Block(self, node: Block):
         self.symbol_table.enter_scope()
@@ -97,96 +182,79 @@ class SemanticAnalyzer:
 
     def visit_VarDecl(self, node: VarDecl):
         # Verificar que el tipo sea válido
-        if node.type_name not in ['int', 'bool']:
-            self.error(f"Tipo desconocido '{node.type_name}'")
+        if node.type_name not in (TYPE_INT, TYPE_BOOL):
+            self.error(ERR_UNKNOWN_TYPE, node.type_name)
             return
 
         # Verificar que no esté ya declarada
         if not self.symbol_table.declare(node.name, node.type_name):
-            self.error(f"Variable '{node.name}' ya fue declarada en este ámbito")
+            self.error(ERR_REDECLARED, node.name)
             return
 
         # Si tiene valor inicial, verificar tipo
         if node.expr:
-            self.visit(node.expr)
-            expr_type = self.infer_type(node.expr)
-            if expr_type and expr_type != node.type_name:
-                self.error(f"Tipo incompatible en declaración: esperado {node.type_name}, obtenido {expr_type}")
+            expr_type = self.visit(node.expr)
+            if expr_type and expr_type is not node.type_name:
+                self.error(ERR_DECL_MISMATCH, node.type_name, expr_type)
 
     def visit_Assign(self, node: Assign):
         var_type = self.symbol_table.lookup(node.name)
         if var_type is None:
-            self.error(f"Variable '{node.name}' no declarada")
+            self.error(ERR_UNDECLARED, node.name)
             return
 
-        self.visit(node.expr)
-        expr_type = self.infer_type(node.expr)
-        if expr_type and expr_type != var_type:
-            self.error(f"Tipo incompatible en asignación: '{node.name}' es {var_type}, pero se asigna {expr_type}")
-
-    def visit_Identifier(self, node: Identifier):
-        if self.symbol_table.lookup(node.name) is None:
-            self.error(f"Variable '{node.name}' no declarada")
+        expr_type = self.visit(node.expr)
+        if expr_type and expr_type is not var_type:
+            self.error(ERR_ASSIGN_MISMATCH, node.name, var_type, expr_type)
 
-    def visit_BinOp(self, node: BinOp):
-        self.visit(node.left)
-        self.visit(node.right)
+    def visit_Identifier(self, node: Identifier) -> Optional[str]:
+        var_type = self.symbol_table.lookup(node.name)
+        if var_type is None:
+            self.error(ERR_UNDECLARED, node.name)
+        return var_type
 
-        left_type = self.infer_type(node.left)
-        right_type = self.infer_type(node.right)
+    def visit_BinOp(self, node: BinOp) -> Optional[str]:
+        left_type = self.visit(node.left)
+        right_type = self.visit(node.right)
 
-        # Operadores aritméticos: deben ser int
-        if node.op in ['+', '-', '*', '/', '%']:
-            if left_type != 'int' or right_type != 'int':
-                self.error(f"Operador '{node.op}' espera operandos int")
+        spec = _BINOP_TABLE.get(node.op)
+        if spec is None:
+            return None
+        result_type, operand_type, err_id = spec
+        if operand_type is None:
+            # Solo se compara si ambos tipos se conocen (si no, ya hubo un error)
+            mismatch = left_type and right_type and left_type is not right_type
+        else:
+            mismatch = left_type is not operand_type or right_type is not operand_type
+        if mismatch:
+            self.error(err_id, node.op, left_type, right_type)
+        return result_type
 
-        # Comparaciones: <, <=, >, >= → int → bool
-        elif node.op in ['<', '<=', '>', '>=', '==']:
-            if node.op == '==':
-                # Ya validamos compatibilidad antes
-                return 'bool'
-            else:
-                if left_type != 'int' or right_type != 'int':
-                    self.error(f"Comparación '{node.op}' requiere int")
-                return 'bool'
-            
-        # Igualdad: ambos operandos del mismo tipo
-        elif node.op == '==':
-            if left_type and right_type:
-                if left_type != right_type:
-                    self.error(f"Comparación de igualdad entre tipos incompatibles: {left_type} y {right_type}")
-            return 'bool'  # ← Agregar retorno aquí también
-
-        # Lógicos: &&, || → bool
-        elif node.op in ['&&', '||']:
-            if left_type != 'bool' or right_type != 'bool':
-                self.error(f"Operador lógico '{node.op}' espera bool")
-
-    def visit_UnaryOp(self, node: UnaryOp):
-        self.visit(node.expr)
-        expr_type = self.infer_type(node.expr)
+    def visit_UnaryOp(self, node: UnaryOp) -> Optional[str]:
+        expr_type = self.visit(node.expr)
 
         if node.op == '!':
-            if expr_type != 'bool':
-                self.error(f"Operador '!' espera un operando bool, no {expr_type}")
+            if expr_type is not TYPE_BOOL:
+                self.error(ERR_NOT_OPERAND, expr_type)
+            return TYPE_BOOL
         elif node.op == '-':  # -unario
-            if expr_type != 'int':
-                self.error(f"Operador '-' unario espera int, no {expr_type}")
+            if expr_type is not TYPE_INT:
+                self.error(ERR_NEG_OPERAND, expr_type)
+            return TYPE_INT
+        return None
 
     def visit_IfStmt(self, node: IfStmt):
-        self.visit(node.cond)
-        cond_type = self.infer_type(node.cond)
-        if cond_type != 'bool':
-            self.error(f"Condición de 'if' debe ser bool, no {cond_type}")
+        cond_type = self.visit(node.cond)
+        if cond_type is not TYPE_BOOL:
+            self.error(ERR_IF_COND, cond_type)
         self.visit(node.then_body)
         if node.else_body:
             self.visit(node.else_body)
 
     def visit_ForStmt(self, node: ForStmt):
-        self.visit(node.cond)
-        cond_type = self.infer_type(node.cond)
-        if cond_type != 'bool':
-            self.error(f"Condición de 'for' debe ser bool, no {cond_type}")
+        cond_type = self.visit(node.cond)
+        if cond_type is not TYPE_BOOL:
+            self.error(ERR_FOR_COND, cond_type)
         self.visit(node.body)
 
     def visit_Call(self, node: Call):
@@ -194,37 +262,14 @@ class SemanticAnalyzer:
         for arg in node.args:
             self.visit(arg)
         # Podrías validar aquí que los argumentos sean int/string
+        # println podría devolver void, pero no se usa → None
 
-    def visit_Literal(self, node: Literal):
-        pass  # No necesita verificación adicional
+    def visit_Literal(self, node: Literal) -> Optional[str]:
+        return node.type_tag
 
-    # ====================
-    # Inferencia de tipo
-    # ====================
 
-    def infer_type(self, node: Node) -> Optional[str]:
-        """Infiere el tipo de una expresión"""
-        if isinstance(node, Literal):
-            return node.type_tag
-        elif isinstance(node, Identifier):
-            return self.symbol_table.lookup(node.name)
-        elif isinstance(node, BinOp):
-            left_type = self.infer_type(node.left)
-            right_type = self.infer_type(node.right)
-
-            if node.op in ['+', '-', '*', '/', '%']:
-                return 'int'
-            elif node.op in ['<', '<=', '>', '>=', '==']:
-                # Ya validamos en visit_BinOp que los operandos sean válidos
-                return 'bool'
-            elif node.op in ['&&', '||']:
-                return 'bool'
-        elif isinstance(node, UnaryOp):
-            if node.op == '!':
-                return 'bool'
-            elif node.op == '-':
-                return 'int'
-        elif isinstance(node, Call):
-            # println podría devolver void, pero no se usa
-            return None
-        return None  # Desconocido
\ No newline at end of file
+# Tabla de despacho indexada por KIND: función visit_* o generic_visit
+_VISIT_TBL = [
+    getattr(SemanticAnalyzer, cls._visit_name, SemanticAnalyzer.generic_visit)
+    for cls in NODE_KINDS
+]
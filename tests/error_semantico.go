@@ -8,6 +8,7 @@ func main() {
     z = 10                 // ❌ No declarada
     var a int = 10
     var a bool = false     // ❌ Redeclaración
+    var c bool = a == y    // ❌ == entre int y bool
     if 5 { }               // ❌ Condición no bool
     for x { }              // ❌ x es int, no bool
 }
\ No newline at end of file